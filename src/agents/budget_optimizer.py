@@ -0,0 +1,222 @@
+# src/agents/budget_optimizer.py
+
+import numpy as np
+import pandas as pd
+
+
+class BudgetOptimizer:
+    """
+    Budget reallocation for the `budget_optimization` intent:
+    - Fits a diminishing-returns curve per adset:
+          daily_revenue ≈ a + b · log(1 + daily_spend)
+      for all adsets at once (grouped least squares via bincount)
+    - Reallocates a fixed total daily budget within per-adset min/max bounds
+      by water-filling on the marginal return b / (1 + spend)
+    - Emits scale_up / scale_down / pause / hold recommendations
+
+    Only adsets whose slope is positive and statistically significant are
+    reallocated; the rest are held at current spend, so a pause is never
+    driven by a noisy or flat fit.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        budget_cfg = cfg.get("budget", {})
+        self.lookback_days = budget_cfg.get("lookback_days", 7)
+        self.min_ratio = budget_cfg.get("min_spend_ratio", 0.0)
+        self.max_ratio = budget_cfg.get("max_spend_ratio", 2.0)
+        self.total_budget = budget_cfg.get("total_daily_budget")
+        self.change_pct = budget_cfg.get("change_threshold_pct", 10.0)
+        self.pause_ratio = budget_cfg.get("pause_ratio", 0.1)
+        self.min_days = budget_cfg.get("min_days", 3)
+        self.min_slope_t = budget_cfg.get("min_slope_t", 2.0)
+
+    def optimize(self, df):
+        if df is None or df.empty:
+            return {}
+
+        daily, keys = self._daily_by_adset(df)
+        a, b, reliable = self.fit_curves(daily["adset_id"].to_numpy(), daily["spend"].to_numpy(),
+                                         daily["revenue"].to_numpy(), len(keys))
+
+        current = self._current_spend(daily, len(keys))
+        days = np.bincount(daily["adset_id"].to_numpy(), minlength=len(keys))
+
+        # Only adsets spending in the lookback window are reallocated
+        active = current > 0
+        keys, a, b, current, days = keys[active], a[active], b[active], current[active], days[active]
+        reliable = reliable[active]
+
+        lo = current * self.min_ratio
+        hi = current * self.max_ratio
+
+        # Too few days or no significant positive slope: keep spend where it is
+        fixed = (days < self.min_days) | ~reliable
+        lo[fixed] = current[fixed]
+        hi[fixed] = current[fixed]
+        total = float(self.total_budget) if self.total_budget else float(current.sum())
+
+        optimal = self.allocate(b, lo, hi, total)
+        allocated = float(optimal.sum())
+
+        # A total outside [Σ lo, Σ hi] cannot be met; allocate clamps to the bound
+        budget_warning = None
+        if total < lo.sum() - 0.005:
+            budget_warning = (f"Requested total {total:.2f} is below the {lo.sum():.2f} "
+                              f"held or minimum spend; allocated {allocated:.2f} instead.")
+        elif total > hi.sum() + 0.005:
+            budget_warning = (f"Requested total {total:.2f} exceeds the {hi.sum():.2f} "
+                              f"held or maximum spend; allocated {allocated:.2f} instead.")
+
+        revenue_now = a + b * np.log1p(current)
+        revenue_opt = a + b * np.log1p(optimal)
+
+        change = (optimal - current) / current * 100
+
+        actions = np.select(
+            [optimal <= current * self.pause_ratio,
+             change > self.change_pct,
+             change < -self.change_pct],
+            ["pause", "scale_up", "scale_down"],
+            default="hold"
+        )
+        actions = np.where(fixed, "hold", actions)
+
+        recs = keys.assign(
+            current_daily_spend=current.round(2),
+            recommended_daily_spend=optimal.round(2),
+            change_pct=np.round(change, 2),
+            marginal_roas=np.round(b / (1 + optimal), 4),
+            curve_a=np.round(a, 3),
+            curve_b=np.round(b, 3),
+            days_observed=days,
+            curve_reliable=reliable,
+            action=actions
+        ).sort_values("change_pct", ascending=False)
+
+        return {
+            "total_daily_budget": round(total, 2),
+            "allocated_daily_budget": round(allocated, 2),
+            "budget_feasible": budget_warning is None,
+            "budget_warning": budget_warning,
+            "expected_daily_revenue_current": round(float(revenue_now.sum()), 2),
+            "expected_daily_revenue_optimized": round(float(revenue_opt.sum()), 2),
+            "actions": {k: int(v) for k, v in pd.Series(actions, dtype=object).value_counts().items()},
+            "adsets": recs.to_dict(orient="records")
+        }
+
+    # ----------------------------------------------------------------------
+    #  A. Daily spend / revenue per adset
+    # ----------------------------------------------------------------------
+    def _daily_by_adset(self, df):
+        frame = pd.DataFrame({
+            "campaign_name": df["campaign_name"],
+            "adset_name": df["adset_name"],
+            "date": pd.to_datetime(df["date"]),
+            "spend": df["spend"],
+            "revenue": df["revenue"]
+        })
+
+        daily = frame.groupby(["campaign_name", "adset_name", "date"], sort=False, observed=True).agg(
+            spend=("spend", "sum"), revenue=("revenue", "sum")
+        ).reset_index()
+
+        codes, uniques = pd.factorize(
+            pd.MultiIndex.from_frame(daily[["campaign_name", "adset_name"]])
+        )
+        daily["adset_id"] = codes
+        keys = pd.DataFrame(list(uniques), columns=["campaign_name", "adset_name"])
+        return daily, keys
+
+    def _current_spend(self, daily, n):
+        """
+        Average daily spend over the lookback window (the budget baseline).
+        """
+        recent = daily[daily["date"] > daily["date"].max() - pd.Timedelta(days=self.lookback_days)]
+        ids = recent["adset_id"].to_numpy()
+        spend = np.bincount(ids, weights=recent["spend"].to_numpy(), minlength=n)
+        days = np.bincount(ids, minlength=n)
+        return np.divide(spend, days, out=np.zeros(n), where=days > 0)
+
+    # ----------------------------------------------------------------------
+    #  B. Vectorised curve fitting
+    # ----------------------------------------------------------------------
+    def fit_curves(self, group, spend, revenue, n):
+        """
+        Per-group OLS of revenue on log1p(spend), solved in closed form from
+        grouped sums.
+
+        A fit is `reliable` when its slope is positive with a t-statistic of
+        at least `min_slope_t`. Unreliable groups fall back to a curve
+        through the origin (b = Σxy / Σx², i.e. their average return on
+        log-spend), which is used for revenue estimates only.
+        """
+        x = np.log1p(np.clip(spend, 0, None))
+        y = np.nan_to_num(revenue)
+
+        sn = np.bincount(group, minlength=n).astype(float)
+        sx = np.bincount(group, weights=x, minlength=n)
+        sy = np.bincount(group, weights=y, minlength=n)
+        sxx = np.bincount(group, weights=x * x, minlength=n)
+        sxy = np.bincount(group, weights=x * y, minlength=n)
+        syy = np.bincount(group, weights=y * y, minlength=n)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Centred sums
+            cxx = sxx - sx * sx / sn
+            cxy = sxy - sx * sy / sn
+            cyy = syy - sy * sy / sn
+
+            slope = cxy / cxx
+            sse = np.clip(cyy - slope * cxy, 0, None)
+            se = np.sqrt(sse / (sn - 2) / cxx)
+            t = np.where(se > 0, slope / se, np.where(slope > 0, np.inf, 0.0))
+
+            through_origin = np.clip(np.nan_to_num(sxy / sxx), 0, None)
+
+        # Degenerate spend variation leaves cxx ~ 0 and the slope meaningless
+        varied = cxx > 1e-9 * np.maximum(sxx, 1.0)
+        reliable = varied & (sn >= 3) & (np.nan_to_num(slope) > 0) & (np.nan_to_num(t) >= self.min_slope_t)
+
+        b = np.where(reliable, np.nan_to_num(slope), through_origin)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = np.where(reliable, (sy - b * sx) / sn, 0.0)
+        return np.nan_to_num(a), b, reliable
+
+    # ----------------------------------------------------------------------
+    #  C. Constrained reallocation
+    # ----------------------------------------------------------------------
+    def allocate(self, b, lo, hi, total, iters=100):
+        """
+        Maximises Σ b·log(1+s) subject to Σ s = total and lo ≤ s ≤ hi.
+
+        KKT gives s = clip(b/λ − 1, lo, hi); Σ s is monotone in λ, so λ is
+        found by bisection, evaluated for every adset at once. A total
+        outside [Σ lo, Σ hi] is infeasible: the nearest bound is returned.
+        """
+        if total <= lo.sum():
+            return lo.copy()
+        if total >= hi.sum():
+            return hi.copy()
+
+        def spend_at(lam):
+            return np.clip(b / lam - 1, lo, hi)
+
+        # λ bracket: at lam_hi everything sits at lo, at lam_lo everything at hi
+        lam_lo = max(float((b / (1 + hi)).min()), 1e-12)
+        lam_hi = max(float((b / (1 + lo)).max()), lam_lo * 2)
+
+        for _ in range(iters):
+            lam = np.sqrt(lam_lo * lam_hi)
+            if spend_at(lam).sum() > total:
+                lam_lo = lam
+            else:
+                lam_hi = lam
+
+        s = spend_at(lam_hi)
+        # Hand the bisection residual to adsets with headroom, proportionally
+        gap = total - s.sum()
+        room = (hi - s) if gap > 0 else (s - lo)
+        if room.sum() > 0:
+            s = s + np.sign(gap) * room * min(abs(gap) / room.sum(), 1.0)
+        return s
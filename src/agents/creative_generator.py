@@ -3,9 +3,48 @@
 import pandas as pd
 import numpy as np
 
+
+ISSUES = ["CTR Decline", "ROAS Decline", "General Fatigue"]
+
+# Single source of template copy; config.yaml → creatives.templates overrides keys
+DEFAULT_TEMPLATES = {
+    "issues": {
+        "CTR Decline": {
+            "hook": "Stop scrolling — see why 50,000+ customers chose us this week!",
+            "value_prop": "Experience comfort redefined — designed for all-day wear.",
+            "cta": "View Styles",
+            "format": "Short punchy 5–7 sec video"
+        },
+        "ROAS Decline": {
+            "hook": "Save more with our best-value bundles — limited time.",
+            "value_prop": "Get premium quality without premium prices — try the bestseller pack.",
+            "cta": "Shop & Save",
+            "format": "Offer-banner + static hero image"
+        },
+        "General Fatigue": {
+            "hook": "A bold new look designed just for you.",
+            "value_prop": "A trusted choice — crafted with high-grade materials.",
+            "cta": "Explore Now",
+            "format": "Standard creative refresh"
+        }
+    },
+    "segment": {
+        "message": "Designed for {country} — optimized {creative_type} variant now live!",
+        "fallback_message": "Fresh look curated for you.",
+        "cta": "Try Now",
+        "format": "Localized static + testimonial"
+    },
+    "phrase": {
+        "message": "Lead with “{phrase}” — our strongest-converting message angle.",
+        "cta": "Shop Now",
+        "format": "Static hero with headline copy test"
+    }
+}
+
+
 class CreativeGenerator:
     """
-    V2 Creative Agent:
+    V3 Creative Agent:
     - Reads validated hypotheses
     - Ties creatives directly to insight drivers
     - Uses segment-level diagnosis (low CTR, low ROAS groups)
@@ -14,37 +53,67 @@ class CreativeGenerator:
         * Value prop
         * CTA
         * Format suggestion
+
+    Message templates are loaded from config once and compiled into a
+    lookup table keyed by (issue, segment attributes). Hypotheses are
+    processed in batches and identical directions are emitted once, with
+    each creative holding references into the shared `directions` table.
+
+    When MessageAnalyst output is supplied, a phrase-led direction reuses the
+    best-lifting phrase and steers away from fatigued ones.
     """
 
     def __init__(self, cfg):
         self.cfg = cfg
+        creative_cfg = cfg.get("creatives") or {}
+        self.batch_size = creative_cfg.get("batch_size", 1000)
+        self.templates = self._load_templates(creative_cfg.get("templates") or {})
+        self._table = self._compile(self.templates)
 
-    def generate(self, df, validated_hypotheses):
+    def generate(self, df, validated_hypotheses, message_insights=None):
+        """
+        Returns a compact payload:
+        - target_segments: worst segments (emitted once)
+        - directions: unique creative directions keyed by id
+        - creatives: one entry per hypothesis referencing direction ids
+        """
         if df is None or df.empty:
-            return []
-
-        creatives = []
+            return {"target_segments": [], "directions": {}, "creatives": []}
 
         # 1. Identify worst segments (helpful for creative targeting)
         worst_segments = self._find_worst_segments(df)
+        segment_key = self._segment_key(worst_segments)
+        phrase_key = self._phrase_key(message_insights)
+
+        directions = {}
+        ids = {}
+        creatives = []
 
-        for hypo in validated_hypotheses:
-            title = hypo.get("title", "")
-            evidence = hypo.get("evidence", {})
-            confidence = hypo.get("confidence", 0.0)
+        for start in range(0, len(validated_hypotheses), self.batch_size):
+            batch = validated_hypotheses[start:start + self.batch_size]
+            issues = self._detect_issues(batch)
 
-            # Generate 3 creative directions for each hypothesis
-            ideas = self._generate_creative_directions(title, evidence, worst_segments)
+            for offset, (hypo, issue) in enumerate(zip(batch, issues)):
+                refs = []
+                for key in self._direction_keys(issue, segment_key, phrase_key):
+                    if key not in ids:
+                        ids[key] = f"d{len(ids) + 1}"
+                        directions[ids[key]] = self._lookup(key, worst_segments)
+                    refs.append(ids[key])
 
-            creatives.append({
-                "hypothesis": title,
-                "confidence": confidence,
-                "evidence": evidence,
-                "target_segments": worst_segments,
-                "creative_directions": ideas
-            })
+                creatives.append({
+                    "hypothesis": hypo.get("title", ""),
+                    "hypothesis_ref": start + offset,
+                    "confidence": hypo.get("confidence", 0.0),
+                    "problem_targeted": issue,
+                    "creative_directions": refs
+                })
 
-        return creatives
+        return {
+            "target_segments": worst_segments,
+            "directions": directions,
+            "creatives": creatives
+        }
 
     # ----------------------------------------------------------------------
     #  A. Identify performance-broken segments (low CTR / low ROAS groups)
@@ -53,7 +122,7 @@ class CreativeGenerator:
         try:
             segment_cols = ["country", "platform", "creative_type"]
 
-            segments = df.groupby(segment_cols).agg({
+            segments = df.groupby(segment_cols, observed=True).agg({
                 "ctr": "mean",
                 "roas": "mean",
                 "clicks": "sum",
@@ -72,92 +141,123 @@ class CreativeGenerator:
             return []  # fallback gracefully
 
     # ----------------------------------------------------------------------
-    #  B. Generate creative directions based on hypothesis & evidence
+    #  B. Template loading & compilation
     # ----------------------------------------------------------------------
-    def _generate_creative_directions(self, title, evidence, segments):
-        ctr_delta = evidence.get("ctr_delta_pct", None)
-        roas_delta = evidence.get("roas_delta_pct", None)
-        top_issue = self._detect_issue(ctr_delta, roas_delta)
-
-        ideas = []
-
-        # Creative Direction 1: Hook-Based Fix
-        ideas.append({
-            "angle": "Hook Refresh",
-            "problem_targeted": top_issue,
-            "message": self._hook_based_message(top_issue),
-            "cta": self._cta(top_issue),
-            "format": self._format_suggestion(top_issue),
-            "why_it_works": "Addressing the primary drop driver found in metrics."
-        })
-
-        # Creative Direction 2: Value Proposition Reinforcement
-        ideas.append({
-            "angle": "Value Proposition Deepening",
-            "problem_targeted": top_issue,
-            "message": self._value_prop_message(top_issue),
-            "cta": self._cta(top_issue),
-            "format": "Carousel or UGC review clip",
-            "why_it_works": "Strengthens product trust after performance decline."
-        })
-
-        # Creative Direction 3: Segment-Specific Variant
-        ideas.append({
+    def _load_templates(self, overrides):
+        # YAML keys left empty load as None, so `or {}` rather than a default
+        issue_overrides = overrides.get("issues") or {}
+        issues = {
+            issue: {**DEFAULT_TEMPLATES["issues"][issue], **(issue_overrides.get(issue) or {})}
+            for issue in ISSUES
+        }
+        segment = {**DEFAULT_TEMPLATES["segment"], **(overrides.get("segment") or {})}
+        phrase = {**DEFAULT_TEMPLATES["phrase"], **(overrides.get("phrase") or {})}
+        return {"issues": issues, "segment": segment, "phrase": phrase}
+
+    def _compile(self, templates):
+        """
+        Pre-builds the issue-driven directions. Segment-personalised and
+        phrase-led directions depend on the data and are filled in lazily.
+        """
+        table = {}
+        for issue, t in templates["issues"].items():
+            table[(issue, "hook")] = {
+                "angle": "Hook Refresh",
+                "problem_targeted": issue,
+                "message": t["hook"],
+                "cta": t["cta"],
+                "format": t["format"],
+                "why_it_works": "Addressing the primary drop driver found in metrics."
+            }
+            table[(issue, "value_prop")] = {
+                "angle": "Value Proposition Deepening",
+                "problem_targeted": issue,
+                "message": t["value_prop"],
+                "cta": t["cta"],
+                "format": "Carousel or UGC review clip",
+                "why_it_works": "Strengthens product trust after performance decline."
+            }
+        return table
+
+    def _segment_key(self, segments):
+        if not segments:
+            return None
+        top = segments[0]
+        return (top.get("country", "your area"), top.get("creative_type", "visual"))
+
+    def _phrase_key(self, insights):
+        if not insights:
+            return None
+        # Prefer phrases that lift ROAS, fall back to CTR winners
+        winners = insights.get("top_roas_phrases") or insights.get("top_ctr_phrases") or []
+        if not winners:
+            return None
+        fatigued = tuple(p["phrase"] for p in insights.get("fatigued_phrases", []))
+        return (winners[0]["phrase"], fatigued)
+
+    def _direction_keys(self, issue, segment_key, phrase_key=None):
+        keys = [(issue, "hook"), (issue, "value_prop"), ("segment", segment_key)]
+        if phrase_key is not None:
+            keys.append(("phrase", phrase_key))
+        return keys
+
+    def _lookup(self, key, segments):
+        if key not in self._table:
+            if key[0] == "phrase":
+                self._table[key] = self._phrase_direction(key[1])
+            else:
+                self._table[key] = self._segment_direction(key[1], segments)
+        return self._table[key]
+
+    def _phrase_direction(self, phrase_key):
+        t = self.templates["phrase"]
+        phrase, fatigued = phrase_key
+
+        return {
+            "angle": "Winning-Phrase Refresh",
+            "problem_targeted": "Message fatigue",
+            "message": t["message"].format(phrase=phrase),
+            "avoid_phrases": list(fatigued),
+            "cta": t["cta"],
+            "format": t["format"],
+            "why_it_works": "Reuses the message phrase with the strongest measured lift."
+        }
+
+    def _segment_direction(self, segment_key, segments):
+        t = self.templates["segment"]
+
+        if segment_key is None:
+            message = t["fallback_message"]
+        else:
+            country, creative_type = segment_key
+            message = t["message"].format(country=country, creative_type=creative_type)
+
+        return {
             "angle": "Segment-Personalized Creative",
             "problem_targeted": "Segment with lowest performance metrics",
-            "segment_used": segments[0] if segments else None,
-            "message": self._segment_message(segments),
-            "cta": "Try Now",
-            "format": "Localized static + testimonial",
+            "segment_ref": 0 if segment_key is not None else None,
+            "message": message,
+            "cta": t["cta"],
+            "format": t["format"],
             "why_it_works": "Uses worst-performing audience group to rebuild CTR/ROAS."
-        })
-
-        return ideas
+        }
 
     # ----------------------------------------------------------------------
-    # C. Helper logic for creative reasoning
+    #  C. Helper logic for creative reasoning
     # ----------------------------------------------------------------------
-    def _detect_issue(self, ctr_delta, roas_delta):
-        if ctr_delta is not None and ctr_delta < -10:
-            return "CTR Decline"
-        if roas_delta is not None and roas_delta < -10:
-            return "ROAS Decline"
-        return "General Fatigue"
-
-    def _hook_based_message(self, issue):
-        if issue == "CTR Decline":
-            return "Stop scrolling — see why 50,000+ customers chose us this week!"
-        if issue == "ROAS Decline":
-            return "Save more with our best-value bundles — limited time."
-        return "A bold new look designed just for you."
-
-    def _value_prop_message(self, issue):
-        if issue == "CTR Decline":
-            return "Experience comfort redefined — designed for all-day wear."
-        if issue == "ROAS Decline":
-            return "Get premium quality without premium prices — try the bestseller pack."
-        return "A trusted choice — crafted with high-grade materials."
-
-    def _cta(self, issue):
-        if issue == "CTR Decline":
-            return "View Styles"
-        if issue == "ROAS Decline":
-            return "Shop & Save"
-        return "Explore Now"
-
-    def _format_suggestion(self, issue):
-        if issue == "CTR Decline":
-            return "Short punchy 5–7 sec video"
-        if issue == "ROAS Decline":
-            return "Offer-banner + static hero image"
-        return "Standard creative refresh"
-
-    def _segment_message(self, segments):
-        if not segments:
-            return "Fresh look curated for you."
+    def _detect_issues(self, hypotheses):
+        """
+        Vectorised issue detection for a batch of hypotheses.
+        """
+        def deltas(key):
+            values = [h.get("evidence", {}).get(key) for h in hypotheses]
+            return np.array([np.nan if v is None else v for v in values], dtype=float)
 
-        top = segments[0]
-        country = top.get("country", "your area")
-        creative_type = top.get("creative_type", "visual")
+        ctr_delta = deltas("ctr_delta_pct")
+        roas_delta = deltas("roas_delta_pct")
 
-        return f"Designed for {country} — optimized {creative_type} variant now live!"
+        return np.select(
+            [ctr_delta < -10, roas_delta < -10],
+            ["CTR Decline", "ROAS Decline"],
+            default="General Fatigue"
+        ).tolist()
@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 from src.utils.schema_validator import SchemaValidator, SchemaValidationError
+from src.utils.shared_dataset import SharedDataset
 import yaml
 
 
@@ -66,16 +67,13 @@ def summarize_data(df):
     }
 
 
-def run_data_agent(csv_path, use_sample=False):
+def build_dataset(csv_path):
     """
-    Main Data Agent function (called from orchestrator)
+    Loads, validates and enriches the CSV. Returns (summary, df).
     """
 
-    # Select dataset
-    path = csv_path
-
     # Load dataset
-    df = load_data(path)
+    df = load_data(csv_path)
 
     # Load schema
     schema_file_path = "config/schema.yaml"
@@ -98,3 +96,29 @@ def run_data_agent(csv_path, use_sample=False):
     summary = summarize_data(df)
 
     return summary, df
+
+
+def run_data_agent(csv_path, use_sample=False, shared_cache_dir=None):
+    """
+    Main Data Agent function (called from orchestrator)
+
+    With `shared_cache_dir` set, the enriched dataset is memory-mapped and
+    shared read-only with other runs on this host analysing the same CSV.
+    """
+
+    # Select dataset
+    path = csv_path
+
+    if not shared_cache_dir:
+        return build_dataset(path)
+
+    # Datetime columns are parsed once and shared as datetime64, since string
+    # columns attach as Categoricals (which pd.to_datetime keeps categorical)
+    schema = load_schema("config/schema.yaml")["required_columns"]
+    datetime_columns = [col for col, kind in schema.items() if kind == "datetime"]
+
+    dataset = SharedDataset(path, shared_cache_dir, datetime_columns)
+    summary, df = dataset.attach(lambda: build_dataset(path))
+    print(f"🔹 Data Agent: Attached to shared dataset {dataset.key} ({len(df)} rows).")
+
+    return summary, df
@@ -1,6 +1,19 @@
 import numpy as np
 import pandas as pd
 
+
+def _metric_stats(values):
+    """
+    Variance / std-dev of a metric array, matching pandas' NaN-skipping,
+    ddof=1 behaviour.
+    """
+    clean = values[~np.isnan(values)]
+    if len(clean) < 2:
+        return float("nan"), float("nan")
+    variance = float(np.var(clean, ddof=1))
+    return variance, float(np.sqrt(variance))
+
+
 class Evaluator:
     def __init__(self, cfg):
         self.cfg = cfg
@@ -35,52 +48,64 @@ class Evaluator:
             return "medium"
         return "low"
 
-    def validate(self, hypotheses, df):
+    def _upgrade(self, h, stats_for):
         """
-        Takes hypotheses from InsightAgent and upgrades them with:
-        - confidence
-        - severity
-        - statistical evidence
+        Scores a single hypothesis. Returns the upgraded copy, or None when
+        it falls below the confidence threshold. Never mutates `h`.
         """
-        validated = []
+        # If hypothesis has no delta, it's a fallback hypothesis
+        if "delta_pct" not in h:
+            return {**h, "confidence": 0.4, "severity": "low"}
 
-        for h in hypotheses:
-            # If hypothesis has no delta, it's a fallback hypothesis
-            if "delta_pct" not in h:
-                h["confidence"] = 0.4
-                h["severity"] = "low"
-                validated.append(h)
-                continue
+        delta = h["delta_pct"]
 
-            delta = h["delta_pct"]
+        # Confidence score
+        conf = self._compute_confidence(delta)
 
-            # Confidence score
-            conf = self._compute_confidence(delta)
+        # Keep only meaningful hypotheses
+        if conf < self.min_conf:
+            return None
 
-            # Severity label
-            sev = self._severity(delta)
+        # Severity label
+        sev = self._severity(delta)
 
-            # Statistical strength: variance check
-            metric = h.get("metric", "roas")
-            metric_series = df[metric]
+        # Statistical strength: variance check
+        metric = h.get("metric", "roas")
+        variance, std_dev, sample_size = stats_for(metric)
 
-            variance = float(metric_series.var())
-            std_dev = float(metric_series.std())
+        evidence = {
+            **h.get("evidence", {}),
+            "variance": variance,
+            "std_dev": std_dev,
+            "sample_size": sample_size
+        }
 
-            evidence = h.get("evidence", {})
-            evidence["variance"] = variance
-            evidence["std_dev"] = std_dev
-            evidence["sample_size"] = len(metric_series)
+        return {
+            **h,
+            "confidence": round(conf, 3),
+            "severity": sev,
+            "evidence": evidence
+        }
 
-            upgraded = {
-                **h,
-                "confidence": round(conf, 3),
-                "severity": sev,
-                "evidence": evidence
-            }
+    def validate(self, hypotheses, df):
+        """
+        Takes hypotheses from InsightAgent and upgrades them with:
+        - confidence
+        - severity
+        - statistical evidence
+
+        The only O(rows) work is one variance pass per referenced metric;
+        it is memory-bound, so it stays in-process.
+        """
+        # Each metric column is scanned once, however many hypotheses use it
+        cache = {}
 
-            # Keep only meaningful hypotheses
-            if conf >= self.min_conf:
-                validated.append(upgraded)
+        def stats_for(metric):
+            if metric not in cache:
+                values = df[metric].to_numpy(dtype=np.float64)
+                variance, std_dev = _metric_stats(values)
+                cache[metric] = (variance, std_dev, len(values))
+            return cache[metric]
 
-        return validated
+        upgraded = (self._upgrade(h, stats_for) for h in hypotheses)
+        return [h for h in upgraded if h is not None]
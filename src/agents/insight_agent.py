@@ -69,8 +69,8 @@ class InsightAgent:
         segments = ["country", "platform", "audience_type"]
 
         for seg in segments:
-            group_last = last7.groupby(seg)["roas"].mean()
-            group_prev = prev7.groupby(seg)["roas"].mean()
+            group_last = last7.groupby(seg, observed=True)["roas"].mean()
+            group_prev = prev7.groupby(seg, observed=True)["roas"].mean()
 
             for key in group_last.index:
                 if key in group_prev:
@@ -0,0 +1,268 @@
+# src/agents/message_analyst.py
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+TOKEN_PATTERN = r"[a-z0-9]+(?:['’‑-][a-z0-9]+)*"
+# Any other non-space character (—, commas, periods, "&", ...) ends a phrase
+BREAK_PATTERN = r"[^\sa-z0-9]"
+
+DEFAULT_STOP_WORDS = {
+    "a", "an", "and", "are", "at", "for", "in", "is", "it", "of", "on",
+    "or", "that", "the", "to", "with", "you", "your", "our", "we"
+}
+
+
+class MessageIndex:
+    """
+    Inverted token / n-gram index over creative messages.
+
+    Rows are mapped to their unique message once (`row_doc`), and messages to
+    terms through a binary CSR matrix (`doc_term`, messages x terms). Any
+    per-row metric can then be rolled up to every term with one bincount and
+    one sparse product, so the index is built once and reused across queries.
+    """
+
+    def __init__(self, terms, doc_term, row_doc, messages):
+        self.terms = terms
+        self.doc_term = doc_term
+        self.row_doc = row_doc
+        self.messages = messages
+        self.term_ids = {t: i for i, t in enumerate(terms)}
+
+    @classmethod
+    def build(cls, messages, ngram_max=2, stop_words=None):
+        stop_words = DEFAULT_STOP_WORDS if stop_words is None else set(stop_words)
+
+        # Rows → unique messages (ad copy is heavily reused across rows).
+        # Missing messages (code -1) share one trailing empty document.
+        row_doc, uniques = pd.factorize(messages)
+        uniques = np.asarray(uniques, dtype=object)
+        if (row_doc < 0).any():
+            row_doc = np.where(row_doc < 0, len(uniques), row_doc)
+            uniques = np.append(uniques, "")
+        uniques = pd.Series(uniques)
+
+        # Unique messages → tokens and clause breaks, one row per (doc, position)
+        pieces = uniques.str.lower().str.findall(f"{TOKEN_PATTERN}|{BREAK_PATTERN}").explode().dropna()
+        is_token = pieces.str.fullmatch(TOKEN_PATTERN).to_numpy(dtype=bool)
+        # Clause id: bumped at every break, so n-grams never span punctuation
+        clauses = np.cumsum(~is_token)[is_token]
+        docs = pieces.index.to_numpy()[is_token]
+        tokens = pieces.to_numpy(dtype=object)[is_token]
+        stop = np.isin(tokens, list(stop_words))
+
+        # Unigrams: every token that is not a stop word
+        term_docs = [docs[~stop]]
+        term_text = [tokens[~stop]]
+
+        # n-grams from the full token stream, so they stay verbatim phrases of
+        # the source copy; stop words may sit inside but not at either end
+        gram = pd.Series(tokens)
+        for n in range(2, ngram_max + 1):
+            gram = gram + " " + pd.Series(tokens).shift(-(n - 1))
+            keep = np.zeros(len(tokens), dtype=bool)
+            if len(tokens) >= n:
+                head, tail = slice(None, len(tokens) - n + 1), slice(n - 1, None)
+                keep[head] = ((docs[tail] == docs[head]) & (clauses[tail] == clauses[head]) &
+                              ~stop[head] & ~stop[tail])
+            term_docs.append(docs[keep])
+            term_text.append(gram[keep].to_numpy(dtype=object))
+
+        all_docs = np.concatenate(term_docs)
+        term_codes, terms = pd.factorize(np.concatenate(term_text))
+
+        doc_term = sparse.csr_matrix(
+            (np.ones(len(all_docs), dtype=np.float64), (all_docs, term_codes)),
+            shape=(len(uniques), len(terms))
+        )
+        doc_term.data[:] = 1.0  # presence, not frequency
+
+        return cls(list(terms), doc_term, row_doc, uniques.tolist())
+
+    def save(self, path):
+        """
+        Writes the index to an .npz (no pickling); the file is published with
+        an atomic replace so concurrent readers never see a partial write.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                terms=np.array(self.terms, dtype=str),
+                messages=np.array([str(m) for m in self.messages], dtype=str),
+                row_doc=self.row_doc,
+                indices=self.doc_term.indices,
+                indptr=self.doc_term.indptr,
+                shape=np.array(self.doc_term.shape)
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            doc_term = sparse.csr_matrix(
+                (np.ones(len(z["indices"]), dtype=np.float64), z["indices"], z["indptr"]),
+                shape=tuple(z["shape"])
+            )
+            return cls(z["terms"].tolist(), doc_term, z["row_doc"], z["messages"].tolist())
+
+    def aggregate(self, values, mask=None):
+        """
+        Sums per-row `values` (rows x k) for every term → (terms x k).
+        `mask` restricts the roll-up to a subset of rows.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, None]
+        if mask is not None:
+            values = values * mask[:, None]
+
+        doc_sums = np.column_stack([
+            np.bincount(self.row_doc, weights=values[:, k], minlength=len(self.messages))
+            for k in range(values.shape[1])
+        ])
+        return self.doc_term.T @ doc_sums
+
+    def rows_with(self, phrase):
+        """
+        Row positions whose message contains `phrase`.
+        """
+        j = self.term_ids.get(phrase.lower())
+        if j is None:
+            return np.array([], dtype=np.int64)
+        docs = self.doc_term[:, j].nonzero()[0]
+        return np.flatnonzero(np.isin(self.row_doc, docs))
+
+
+class MessageAnalyst:
+    """
+    Creative-message text analytics:
+    - Builds a MessageIndex once per dataset
+    - Attributes CTR / ROAS lift or decline to phrases
+    - Flags message fatigue (phrase CTR falling last 7d vs previous 7d)
+
+    The index is cached against a content hash of the message column, so a
+    long-lived analyst (the Orchestrator keeps one) reuses it across queries
+    on the same data. With `shared_dataset.enabled`, the index is also saved
+    as an .npz in the shared-dataset cache dir, so later processes (one CLI
+    query each) load it instead of rebuilding.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        msg_cfg = cfg.get("message_analytics", {})
+        self.ngram_max = msg_cfg.get("ngram_max", 2)
+        self.min_rows = msg_cfg.get("min_rows", 30)
+        self.top_n = msg_cfg.get("top_n", 5)
+        self.fatigue_pct = msg_cfg.get("fatigue_drop_pct", 10.0)
+        self.stop_words = msg_cfg.get("stop_words")
+        self._index = None
+        self._index_key = None
+
+        shared_cfg = cfg.get("shared_dataset", {})
+        self.cache_dir = shared_cfg.get("cache_dir", ".cache/shared_datasets") if shared_cfg.get("enabled") else None
+
+    def _messages_key(self, messages):
+        # Vectorised row hashes; cheap for Categorical (shared-dataset) columns.
+        # Index settings are part of the key so a config change never reuses a stale index.
+        hashes = pd.util.hash_pandas_object(messages, index=False).to_numpy()
+        stop_words = sorted(DEFAULT_STOP_WORDS if self.stop_words is None else self.stop_words)
+        settings = f"{self.ngram_max}|{','.join(stop_words)}"
+        return hashlib.sha1(hashes.tobytes() + settings.encode("utf-8")).hexdigest()
+
+    def index(self, df):
+        key = self._messages_key(df["creative_message"])
+        if self._index_key != key:
+            self._index = self._load_or_build(df["creative_message"], key)
+            self._index_key = key
+        return self._index
+
+    def _load_or_build(self, messages, key):
+        path = os.path.join(self.cache_dir, f"messages-{key[:16]}.npz") if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                return MessageIndex.load(path)
+            except (OSError, ValueError, KeyError):
+                pass  # unreadable cache file: rebuild and overwrite it
+
+        index = MessageIndex.build(messages, self.ngram_max, self.stop_words)
+        if path:
+            index.save(path)
+        return index
+
+    def analyze(self, df):
+        if df is None or df.empty:
+            return {}
+
+        index = self.index(df)
+
+        # Missing metric values count as zero, like pandas' skipna sums
+        values = np.nan_to_num(np.column_stack([
+            df["clicks"].to_numpy(dtype=np.float64),
+            df["impressions"].to_numpy(dtype=np.float64),
+            df["revenue"].to_numpy(dtype=np.float64),
+            df["spend"].to_numpy(dtype=np.float64),
+            np.ones(len(df))
+        ]))
+
+        # Same 7-day windows as InsightAgent
+        dates = pd.to_datetime(df["date"])
+        end = dates.max()
+        last7 = (dates >= end - pd.Timedelta(days=7)).to_numpy()
+        prev7 = ((dates < end - pd.Timedelta(days=7)) &
+                 (dates >= end - pd.Timedelta(days=14))).to_numpy()
+
+        term_all = index.aggregate(values)
+        term_last = index.aggregate(values, last7)
+        term_prev = index.aggregate(values, prev7)
+
+        phrases = pd.DataFrame({"phrase": index.terms, "rows": term_all[:, 4]})
+
+        # Lift is measured against rows whose message does NOT contain the phrase
+        rest = values.sum(axis=0) - term_all
+        with np.errstate(divide="ignore", invalid="ignore"):
+            phrases["ctr"] = term_all[:, 0] / term_all[:, 1]
+            phrases["roas"] = term_all[:, 2] / term_all[:, 3]
+            phrases["ctr_lift_pct"] = (phrases["ctr"] / (rest[:, 0] / rest[:, 1]) - 1) * 100
+            phrases["roas_lift_pct"] = (phrases["roas"] / (rest[:, 2] / rest[:, 3]) - 1) * 100
+            ctr_last = term_last[:, 0] / term_last[:, 1]
+            ctr_prev = term_prev[:, 0] / term_prev[:, 1]
+            phrases["ctr_last_7d"] = ctr_last
+            phrases["ctr_prev_7d"] = ctr_prev
+            phrases["ctr_delta_pct"] = (ctr_last / ctr_prev - 1) * 100
+
+        phrases = phrases.replace([np.inf, -np.inf], np.nan)
+        supported = phrases[phrases["rows"] >= self.min_rows].dropna(subset=["ctr_lift_pct", "roas_lift_pct"])
+
+        lift_cols = ["phrase", "rows", "ctr", "ctr_lift_pct", "roas", "roas_lift_pct"]
+        fatigue_cols = ["phrase", "ctr_last_7d", "ctr_prev_7d", "ctr_delta_pct"]
+
+        windowed = (term_last[:, 4] >= self.min_rows) & (term_prev[:, 4] >= self.min_rows)
+        fatigued = phrases[windowed & (phrases["ctr_delta_pct"] < -self.fatigue_pct).to_numpy()]
+
+        return {
+            "index": {
+                "rows": len(df),
+                "messages": len(index.messages),
+                "terms": len(index.terms)
+            },
+            "top_ctr_phrases": self._records(supported.nlargest(self.top_n, "ctr_lift_pct"), lift_cols),
+            "top_roas_phrases": self._records(supported.nlargest(self.top_n, "roas_lift_pct"), lift_cols),
+            "declining_phrases": self._records(supported.nsmallest(self.top_n, "roas_lift_pct"), lift_cols),
+            "fatigued_phrases": self._records(fatigued.nsmallest(self.top_n, "ctr_delta_pct"), fatigue_cols)
+        }
+
+    def _records(self, frame, cols):
+        out = frame[cols].copy()
+        num = out.select_dtypes("number").columns
+        out[num] = out[num].round(4)
+        if "rows" in out:
+            out["rows"] = out["rows"].astype(int)
+        return out.to_dict(orient="records")
@@ -50,7 +50,12 @@ class Planner:
             plan["steps"].append("generate_hypotheses")
             plan["steps"].append("validate_hypotheses")
 
+        if intent == "budget_optimization":
+            plan["steps"].append("fit_spend_curves")
+            plan["steps"].append("optimize_budget")
+
         if intent == "creative_analysis":
+            plan["steps"].append("analyze_creative_messages")
             plan["steps"].append("generate_creative_ideas")
 
         # Final report generation step
@@ -7,12 +7,16 @@ from src.agents.planner import Planner
 from src.agents.insight_agent import InsightAgent
 from src.agents.evaluator import Evaluator
 from src.agents.creative_generator import CreativeGenerator
+from src.agents.message_analyst import MessageAnalyst
+from src.agents.budget_optimizer import BudgetOptimizer
 
 
 class Orchestrator:
     def __init__(self, cfg):
         self.cfg = cfg
         self.output_path = cfg["paths"]["reports"]
+        # Long-lived so its message index is reused across queries
+        self.message_analyst = MessageAnalyst(cfg)
         os.makedirs(self.output_path, exist_ok=True)
 
     def _get_ist_timestamp(self):
@@ -53,9 +57,11 @@ class Orchestrator:
         # 2. Data Agent
         # ------------------------------- #
         data_path = self.cfg["paths"]["data"]
+        shared_cfg = self.cfg.get("shared_dataset", {})
         summary, df = run_data_agent(
             data_path,
-            use_sample=self.cfg.get("use_sample_data", True)
+            use_sample=self.cfg.get("use_sample_data", True),
+            shared_cache_dir=shared_cfg.get("cache_dir", ".cache/shared_datasets") if shared_cfg.get("enabled") else None
         )
         log("📌 Data Agent: Data summary generated.")
 
@@ -74,14 +80,33 @@ class Orchestrator:
         log("📌 Evaluator: Hypotheses validated.")
 
         # ------------------------------- #
-        # 5. Creative Agent
+        # 5. Message Analyst
+        # ------------------------------- #
+        message_insights = None
+        if "analyze_creative_messages" in plan["steps"]:
+            message_insights = self.message_analyst.analyze(df)
+            log("📌 Message Analyst: Creative-message phrases analyzed.")
+
+        # ------------------------------- #
+        # 6. Creative Agent
         # ------------------------------- #
         creative_gen = CreativeGenerator(self.cfg)
-        creatives = creative_gen.generate(df, validated)
+        creatives = creative_gen.generate(df, validated, message_insights)
         log("📌 Creative Agent: Creatives generated.")
 
         # ------------------------------- #
-        # 6. Save Outputs
+        # 7. Budget Optimizer
+        # ------------------------------- #
+        budget = None
+        if "optimize_budget" in plan["steps"]:
+            budget_optimizer = BudgetOptimizer(self.cfg)
+            budget = budget_optimizer.optimize(df)
+            log("📌 Budget Optimizer: Reallocation computed.")
+            if budget.get("budget_warning"):
+                log(f"⚠️ Budget Optimizer: {budget['budget_warning']}")
+
+        # ------------------------------- #
+        # 8. Save Outputs
         # ------------------------------- #
         timestamp = self._get_ist_timestamp()
 
@@ -93,11 +118,14 @@ class Orchestrator:
             "data_summary": summary
         }
 
+        if message_insights is not None:
+            insights_out["message_analytics"] = message_insights
+
         creatives_out = {
             "run_id": run_id,
             "query": query,
             "timestamp": timestamp,
-            "creatives": creatives
+            **creatives
         }
 
         with open(os.path.join(run_dir, "insights.json"), "w", encoding="utf-8") as f:
@@ -106,6 +134,16 @@ class Orchestrator:
         with open(os.path.join(run_dir, "creatives.json"), "w", encoding="utf-8") as f:
             json.dump(creatives_out, f, indent=2, ensure_ascii=False)
 
+        if budget is not None:
+            budget_out = {
+                "run_id": run_id,
+                "query": query,
+                "timestamp": timestamp,
+                **budget
+            }
+            with open(os.path.join(run_dir, "budget.json"), "w", encoding="utf-8") as f:
+                json.dump(budget_out, f, indent=2, ensure_ascii=False)
+
         with open(os.path.join(run_dir, "report.md"), "w", encoding="utf-8") as f:
             f.write("# 📊 Kasparro Agent Report (IST)\n\n")
             f.write(f"### Run ID: {run_id}\n")
@@ -117,6 +155,22 @@ class Orchestrator:
                 conf = h.get("confidence", "N/A")
                 f.write(f"- **{title}** (confidence={conf})\n")
 
+            if budget:
+                f.write("\n## 💰 Budget Reallocation\n")
+                f.write(f"- Total daily budget: {budget['allocated_daily_budget']}"
+                        f" (requested {budget['total_daily_budget']})\n")
+                if budget["budget_warning"]:
+                    f.write(f"- ⚠️ {budget['budget_warning']}\n")
+                f.write(f"- Expected daily revenue: {budget['expected_daily_revenue_current']}"
+                        f" → {budget['expected_daily_revenue_optimized']}\n")
+                f.write(f"- Actions: {budget['actions']}\n\n")
+                for a in budget["adsets"]:
+                    if a["action"] == "hold":
+                        continue
+                    f.write(f"- **{a['action']}** {a['campaign_name']} / {a['adset_name']}: "
+                            f"{a['current_daily_spend']} → {a['recommended_daily_spend']}"
+                            f" ({a['change_pct']}%)\n")
+
         log("✔️ Outputs saved successfully")
         log(f"📁 Run folder created at: {run_dir}")
         log("🎉 Status: Completed")
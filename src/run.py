@@ -19,6 +19,8 @@ def main():
     parser.add_argument("query", help="User query, e.g., 'Analyze ROAS drop last 7 days'")
     parser.add_argument("--config", default="config/config.yaml")
     parser.add_argument("--sample", action="store_true")
+    parser.add_argument("--shared", action="store_true",
+                        help="Share one memory-mapped dataset across concurrent runs")
     args = parser.parse_args()
 
     # Load config safely
@@ -28,6 +30,10 @@ def main():
     if args.sample:
         cfg["use_sample_data"] = True
 
+    # Override with shared-dataset flag
+    if args.shared:
+        cfg.setdefault("shared_dataset", {})["enabled"] = True
+
     # Start orchestrator
     orchestrator = Orchestrator(cfg)
     orchestrator.run(args.query)
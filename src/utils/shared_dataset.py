@@ -0,0 +1,339 @@
+import atexit
+import gc
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+class SharedDatasetError(Exception):
+    pass
+
+
+def _codes_dtype(n_categories):
+    # Same width pandas picks for Categorical codes, so from_codes never copies
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _pid_alive(pid):
+    """
+    Cross-platform liveness probe. On Windows `os.kill` terminates the
+    target, so the process handle is queried through the Win32 API instead.
+    """
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        ERROR_ACCESS_DENIED = 5
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            # Access denied means the process exists but belongs to someone else
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+        try:
+            code = wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class SharedDataset:
+    """
+    Memory-mapped, read-only copy of the enriched dataset shared by every
+    run on this host that analyses the same CSV.
+
+    The first process materialises the typed columns into a cache folder:
+    - numeric columns  → one .npy file each (attached with mmap, zero-copy)
+    - datetime columns → datetime64 .npy files (mmap), parsed once up front
+    - string columns   → category codes (.npy, mmap) + a small JSON vocabulary,
+                         attached as pandas Categoricals over the mapped codes
+    Later processes attach to the same files, so N concurrent runs cost
+    roughly one dataset's worth of page cache. Attached string columns are
+    `category` dtype; only their vocabularies are private per process.
+
+    Each attached handle drops a ref file tagged with its PID; the last
+    one to detach removes the cache. Refs from crashed processes are pruned.
+    Caches that could not be removed (e.g. files still mapped on Windows) are
+    swept by the next attach.
+    """
+
+    def __init__(self, csv_path, cache_dir, datetime_columns=(), build_timeout=600.0):
+        self.csv_path = os.path.abspath(csv_path)
+        self.cache_dir = cache_dir
+        self.datetime_columns = set(datetime_columns)
+        self.build_timeout = build_timeout
+        self.key = self._dataset_key()
+        self.path = os.path.join(cache_dir, self.key)
+        self.lock_path = self.path + ".lock"
+        self.build_lock_path = self.path + ".build"
+        self.ref_path = os.path.join(self.path, "refs", f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        self.attached = False
+        self._maps = []
+
+    def _dataset_key(self):
+        # Any change to the CSV (path, size, mtime) yields a fresh cache entry
+        st = os.stat(self.csv_path)
+        raw = f"{self.csv_path}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+    # ----------------------------------------------------------------------
+    #  Locking (O_EXCL lock file, locks of dead PIDs are broken)
+    # ----------------------------------------------------------------------
+    def _acquire_lock(self, timeout=30.0, lock_path=None):
+        lock_path = lock_path or self.lock_path
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("utf-8"))
+                os.close(fd)
+                return
+            except FileExistsError:
+                try:
+                    with open(lock_path, "r") as f:
+                        owner = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    owner = 0
+                if owner and not _pid_alive(owner):
+                    try:
+                        os.remove(lock_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+
+            if time.monotonic() > deadline:
+                raise SharedDatasetError(f"Timed out waiting for lock: {lock_path}")
+            time.sleep(0.05)
+
+    def _release_lock(self, lock_path=None):
+        try:
+            os.remove(lock_path or self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    # ----------------------------------------------------------------------
+    #  A. Materialise
+    # ----------------------------------------------------------------------
+    def _materialise(self, df, summary):
+        """
+        Writes the dataset into a private temp folder, then publishes it with
+        a single rename so readers never see a half-written cache. The folder
+        name carries the writer's PID so a crashed writer's leftovers can be
+        swept.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{self.key}-{os.getpid()}-", dir=self.cache_dir)
+        try:
+            columns = []
+            for i, col in enumerate(df.columns):
+                series = df[col]
+                stem = f"col_{i}"
+
+                if col in self.datetime_columns:
+                    np.save(os.path.join(tmp, stem + ".npy"), pd.to_datetime(series).to_numpy())
+                    columns.append({"name": col, "kind": "datetime", "file": stem})
+                elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_object_dtype(series):
+                    np.save(os.path.join(tmp, stem + ".npy"), series.to_numpy())
+                    columns.append({"name": col, "kind": "numeric", "file": stem})
+                else:
+                    codes, uniques = pd.factorize(series)
+                    np.save(os.path.join(tmp, stem + ".npy"), codes.astype(_codes_dtype(len(uniques))))
+                    with open(os.path.join(tmp, stem + ".json"), "w", encoding="utf-8") as f:
+                        json.dump(list(uniques), f, ensure_ascii=False)
+                    columns.append({"name": col, "kind": "string", "file": stem})
+
+            manifest = {
+                "source": self.csv_path,
+                "rows": len(df),
+                "columns": columns,
+                "summary": summary
+            }
+            with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+
+            os.makedirs(os.path.join(tmp, "refs"), exist_ok=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return tmp
+
+    # ----------------------------------------------------------------------
+    #  B. Attach / detach
+    # ----------------------------------------------------------------------
+    def _load(self):
+        with open(os.path.join(self.path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        data = {}
+        for col in manifest["columns"]:
+            stem = os.path.join(self.path, col["file"])
+            mapped = np.load(stem + ".npy", mmap_mode="r")
+            self._maps.append(mapped)
+            values = mapped.view(np.ndarray)
+
+            if col["kind"] == "string":
+                with open(stem + ".json", "r", encoding="utf-8") as f:
+                    vocab = json.load(f)
+                # Codes stay mmap-backed; missing values keep factorize's -1 code
+                values = pd.Categorical.from_codes(values, categories=vocab, validate=False)
+
+            data[col["name"]] = values
+
+        # copy=False keeps every column backed by its read-only mmap
+        return manifest["summary"], pd.DataFrame(data, copy=False)
+
+    def attach(self, build):
+        """
+        Returns (summary, df) for the shared dataset. `build` is called only
+        when no cache exists yet and must return (summary, df).
+
+        Cold starts are serialised on a per-dataset build lock: one run
+        builds and publishes the cache while the others wait and then
+        attach, so concurrent cold runs hold one in-memory copy, not N.
+        """
+        self._sweep()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        while True:
+            self._acquire_lock()
+            try:
+                if os.path.isdir(self.path):
+                    self._add_ref()
+                    break
+            finally:
+                self._release_lock()
+
+            self._acquire_lock(timeout=self.build_timeout, lock_path=self.build_lock_path)
+            try:
+                # Re-check: the cache may have been published while we waited
+                if not os.path.isdir(self.path):
+                    self._publish(*build())
+                    break
+            finally:
+                self._release_lock(self.build_lock_path)
+
+        self.attached = True
+        atexit.register(self.detach)
+        return self._load()
+
+    def _publish(self, summary, df):
+        tmp = self._materialise(df, summary)
+        self._acquire_lock()
+        try:
+            os.rename(tmp, self.path)
+            self._add_ref()
+        finally:
+            self._release_lock()
+
+    def _add_ref(self):
+        with open(self.ref_path, "w") as f:
+            f.write(str(os.getpid()))
+
+    def _live_refs(self, path=None):
+        refs_dir = os.path.join(path or self.path, "refs")
+        live = []
+        for name in os.listdir(refs_dir):
+            pid = name.split("-")[0]
+            if pid.isdigit() and _pid_alive(int(pid)):
+                live.append(name)
+            else:
+                os.remove(os.path.join(refs_dir, name))
+        return live
+
+    def detach(self):
+        """
+        Drops this process's reference; the last live reference deletes
+        the cache folder.
+
+        The handle's own mmaps are released first. Callers must drop the
+        DataFrame returned by `attach` beforehand, otherwise Windows cannot
+        delete the still-mapped files and removal is left to a later sweep.
+        """
+        if not self.attached:
+            return
+        self.attached = False
+
+        self._maps.clear()
+        gc.collect()
+
+        self._acquire_lock()
+        try:
+            try:
+                os.remove(self.ref_path)
+            except FileNotFoundError:
+                pass
+
+            if os.path.isdir(self.path) and not self._live_refs():
+                self._remove(self.path)
+        finally:
+            self._release_lock()
+
+    def _remove(self, path):
+        """
+        Moves a cache out of the way in one rename, then deletes it. If the
+        rename fails (files still mapped), the cache is left intact rather
+        than half-deleted, and is retried by the next sweep.
+        """
+        trash = os.path.join(self.cache_dir, f".trash-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(path, trash)
+        except OSError as e:
+            print(f"⚠️ Shared dataset {os.path.basename(path)} still in use, cleanup deferred: {e}")
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _sweep(self):
+        """
+        Removes leftovers from earlier runs: trash folders whose deletion
+        failed, temp folders of writers that died mid-materialise, and
+        caches of other datasets with no live references.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".trash-"):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if name.startswith("."):
+                # .<key>-<pid>-<random> temp folder from _materialise
+                parts = name[1:].split("-")
+                if len(parts) >= 3 and parts[1].isdigit() and not _pid_alive(int(parts[1])):
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if name == self.key or not os.path.isdir(path):
+                continue
+
+            lock_path = path + ".lock"
+            try:
+                self._acquire_lock(timeout=0.5, lock_path=lock_path)
+            except SharedDatasetError:
+                continue  # another run is busy with it
+            try:
+                if os.path.isdir(os.path.join(path, "refs")) and not self._live_refs(path):
+                    self._remove(path)
+            finally:
+                self._release_lock(lock_path)
@@ -0,0 +1,86 @@
+from src.agents.budget_optimizer import BudgetOptimizer
+import numpy as np
+import pandas as pd
+
+def test_budget_optimizer_reallocates_to_stronger_curve():
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2025-01-01", periods=14).strftime("%Y-%m-%d")
+
+    rows = []
+    for adset, strength in [("Adset-Strong", 300.0), ("Adset-Weak", 20.0), ("Adset-Dead", 0.0)]:
+        for date in dates:
+            spend = rng.uniform(50, 150)
+            rows.append({
+                "campaign_name": "Launch",
+                "adset_name": adset,
+                "date": date,
+                "spend": spend,
+                "revenue": 10 + strength * np.log1p(spend)
+            })
+    df = pd.DataFrame(rows)
+
+    optimizer = BudgetOptimizer({"budget": {"min_spend_ratio": 0.0, "max_spend_ratio": 3.0}})
+    out = optimizer.optimize(df)
+    recs = {a["adset_name"]: a for a in out["adsets"]}
+
+    # Budget is conserved and shifted toward the stronger curve
+    total = sum(a["recommended_daily_spend"] for a in out["adsets"])
+    assert abs(total - out["total_daily_budget"]) < 0.05
+    assert recs["Adset-Strong"]["action"] == "scale_up"
+    assert recs["Adset-Weak"]["action"] in {"pause", "scale_down"}
+    # A flat curve has no significant slope: held, never paused
+    assert recs["Adset-Dead"]["action"] == "hold"
+    assert out["expected_daily_revenue_optimized"] >= out["expected_daily_revenue_current"]
+
+    # Curves are recovered from the daily data
+    assert abs(recs["Adset-Strong"]["curve_b"] - 300.0) < 1e-6
+
+
+def test_budget_optimizer_does_not_pause_noisy_proportional_adsets():
+    rng = np.random.default_rng(1)
+    dates = pd.date_range("2025-01-01", periods=14).strftime("%Y-%m-%d")
+
+    # Revenue ∝ spend (same ROAS everywhere) plus heavy daily noise; with
+    # 14 days some OLS slopes come out negative (previously clipped → pause)
+    rows = []
+    for i in range(40):
+        for date in dates:
+            spend = rng.uniform(50, 500)
+            rows.append({
+                "campaign_name": "Launch",
+                "adset_name": f"Adset-{i}",
+                "date": date,
+                "spend": spend,
+                "revenue": max(0.0, 6.0 * spend + rng.normal(0, 3000))
+            })
+    df = pd.DataFrame(rows)
+
+    out = BudgetOptimizer({}).optimize(df)
+
+    assert out["actions"].get("pause", 0) == 0
+    assert all(a["action"] == "hold" for a in out["adsets"] if not a["curve_reliable"])
+
+
+def test_budget_optimizer_reports_infeasible_total():
+    dates = pd.date_range("2025-01-01", periods=7).strftime("%Y-%m-%d")
+    # Flat revenue: no reliable curve, so both adsets are held at 100/day
+    df = pd.DataFrame([{
+        "campaign_name": "Launch",
+        "adset_name": adset,
+        "date": date,
+        "spend": 100.0,
+        "revenue": 250.0
+    } for adset in ("Adset-A", "Adset-B") for date in dates])
+
+    out = BudgetOptimizer({"budget": {"total_daily_budget": 50}}).optimize(df)
+
+    assert out["total_daily_budget"] == 50
+    assert out["allocated_daily_budget"] == 200
+    assert sum(a["recommended_daily_spend"] for a in out["adsets"]) == 200
+    assert not out["budget_feasible"]
+    assert "below" in out["budget_warning"]
+
+    # A total that fits the bounds is met exactly
+    out = BudgetOptimizer({"budget": {"total_daily_budget": 200}}).optimize(df)
+    assert out["budget_feasible"] and out["budget_warning"] is None
+    assert out["allocated_daily_budget"] == 200
@@ -0,0 +1,46 @@
+from src.agents.creative_generator import CreativeGenerator
+import pandas as pd
+
+def test_creative_generator_dedupes_directions():
+    df = pd.DataFrame({
+        "country": ["US", "IN", "UK", "US"],
+        "platform": ["Facebook", "Instagram", "Facebook", "Instagram"],
+        "creative_type": ["Image", "Video", "UGC", "Carousel"],
+        "ctr": [0.02, 0.01, 0.015, 0.03],
+        "roas": [3.0, 1.0, 2.0, 4.0],
+        "clicks": [100, 50, 80, 120],
+        "spend": [50.0, 40.0, 30.0, 60.0]
+    })
+
+    hypotheses = [
+        {"title": "CTR fell", "confidence": 0.8, "evidence": {"ctr_delta_pct": -25}},
+        {"title": "CTR fell again", "confidence": 0.7, "evidence": {"ctr_delta_pct": -12}},
+        {"title": "ROAS fell", "confidence": 0.9, "evidence": {"roas_delta_pct": -30}},
+        {"title": "Fallback", "confidence": 0.4, "evidence": {}}
+    ]
+
+    # Custom template from config overrides the default copy
+    cfg = {"creatives": {"batch_size": 2, "templates": {"issues": {"CTR Decline": {"cta": "See More"}}}}}
+    out = CreativeGenerator(cfg).generate(df, hypotheses)
+
+    issues = [c["problem_targeted"] for c in out["creatives"]]
+    assert issues == ["CTR Decline", "CTR Decline", "ROAS Decline", "General Fatigue"]
+
+    # 3 issues x 2 issue-driven directions + 1 shared segment direction
+    assert len(out["directions"]) == 7
+    assert out["creatives"][0]["creative_directions"] == out["creatives"][1]["creative_directions"]
+
+    hook = out["directions"][out["creatives"][0]["creative_directions"][0]]
+    assert hook["cta"] == "See More"
+    assert out["target_segments"][0]["country"] == "IN"
+
+
+def test_creative_generator_tolerates_empty_template_keys():
+    import yaml
+
+    # `issues:` / `segment:` with no value load as None
+    cfg = yaml.safe_load("creatives:\n  templates:\n    issues:\n    segment:\n    phrase:\n")
+    generator = CreativeGenerator(cfg)
+
+    assert generator.templates["issues"]["CTR Decline"]["cta"] == "View Styles"
+    assert "{country}" in generator.templates["segment"]["message"]
@@ -1,5 +1,6 @@
 from src.agents.evaluator import Evaluator
 import pandas as pd
+import pytest
 
 def test_evaluator_basic():
     # Create sample dataset (14 days)
@@ -30,3 +31,27 @@ def test_evaluator_basic():
     assert isinstance(validated, list)
     # Assert hypothesis has confidence score
     assert "confidence" in validated[0]
+
+
+
+def test_evaluator_shares_metric_stats():
+    df = pd.DataFrame({
+        "roas": [1.0, 2.5, None, 0.5, 4.0, 2.0],
+        "ctr": [0.01, 0.02, 0.015, 0.03, 0.01, 0.02]
+    })
+
+    hypotheses = [{
+        "title": f"Hypothesis {i}",
+        "metric": "ctr" if i % 2 else "roas",
+        "delta_pct": -15.0 * i,
+        "evidence": {"last_7d": 1.0, "prev_7d": 2.0}
+    } for i in range(1, 5)]
+
+    validated = Evaluator({"confidence_min": 0.6}).validate(hypotheses, df)
+
+    assert len(validated) == 4
+    for h in validated:
+        assert h["evidence"]["variance"] == pytest.approx(df[h["metric"]].var())
+        assert h["evidence"]["std_dev"] == pytest.approx(df[h["metric"]].std())
+    # Inputs are left untouched
+    assert "variance" not in hypotheses[0]["evidence"]
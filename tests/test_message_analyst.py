@@ -0,0 +1,81 @@
+from src.agents.message_analyst import MessageAnalyst, MessageIndex
+import numpy as np
+import pandas as pd
+
+def test_message_index_and_phrase_lift():
+    messages = ["Cooling mesh boxers", "Organic cotton briefs", "Cooling mesh briefs"]
+    dates = pd.date_range("2025-01-01", periods=14).strftime("%Y-%m-%d")
+
+    rows = []
+    for day, date in enumerate(dates):
+        for msg in messages:
+            # "cooling mesh" ads convert well early, then fatigue in the last week
+            strong = "Cooling mesh" in msg
+            clicks = (30 if day < 6 else 10) if strong else 15
+            rows.append({
+                "date": date,
+                "creative_message": msg,
+                "clicks": clicks,
+                "impressions": 1000,
+                "spend": 100.0,
+                "revenue": 400.0 if strong else 200.0
+            })
+    df = pd.DataFrame(rows)
+
+    index = MessageIndex.build(df["creative_message"])
+    assert "cooling mesh" in index.term_ids
+    assert len(index.rows_with("cooling mesh")) == 28
+
+    analyst = MessageAnalyst({"message_analytics": {"min_rows": 5}})
+    out = analyst.analyze(df)
+
+    assert out["index"]["messages"] == 3
+    assert out["top_roas_phrases"][0]["phrase"] in {"cooling", "mesh", "cooling mesh"}
+    assert "cooling mesh" in [p["phrase"] for p in out["fatigued_phrases"]]
+    # Index is reused for the same dataset
+    index = analyst.index(df)
+    assert analyst.index(df.copy()) is index
+
+    # Same shape, different messages: must not reuse the stale index
+    changed = df.assign(creative_message=df["creative_message"].str.replace("mesh", "knit"))
+    assert analyst.index(changed) is not index
+
+
+def test_message_phrases_are_verbatim_source_text():
+    messages = [
+        "Breathable bamboo that moves with you — limited offer on men boxers.",
+        "Wire‑free ease, cloud‑soft cups — men inner vests that fits right.",
+        "Cooling mesh panels for workouts — men boxers you’ll actually love."
+    ]
+    df = pd.DataFrame({"creative_message": messages * 20})
+
+    index = MessageIndex.build(df["creative_message"], ngram_max=3)
+    lowered = [m.lower() for m in messages]
+
+    for term in index.terms:
+        assert any(term in m for m in lowered), term
+    # Stop words never start or end a phrase, but may sit inside one
+    assert "bamboo moves" not in index.term_ids
+    assert "offer men" not in index.term_ids
+    assert "moves with you" not in index.term_ids
+    assert "limited offer" in index.term_ids
+    assert "offer on men" in index.term_ids
+
+
+def test_message_index_persists_across_analysts(tmp_path, monkeypatch):
+    df = pd.DataFrame({"creative_message": ["Cooling mesh boxers", "Organic cotton briefs", None] * 10})
+    cfg = {"shared_dataset": {"enabled": True, "cache_dir": str(tmp_path)}}
+
+    built = MessageAnalyst(cfg).index(df)
+    assert list(tmp_path.glob("messages-*.npz"))
+
+    # A fresh analyst (a later CLI run) loads the saved index instead of rebuilding
+    def no_build(*args, **kwargs):
+        raise AssertionError("rebuilt")
+    monkeypatch.setattr(MessageIndex, "build", no_build)
+    loaded = MessageAnalyst(cfg).index(df)
+
+    assert loaded.terms == built.terms
+    assert loaded.messages == built.messages
+    assert (loaded.aggregate(np.ones(len(df))) == built.aggregate(np.ones(len(df)))).all()
+    assert list(loaded.rows_with("cooling mesh")) == list(built.rows_with("cooling mesh"))
@@ -0,0 +1,118 @@
+from src.utils.shared_dataset import SharedDataset
+import os
+import numpy as np
+import pandas as pd
+
+def test_shared_dataset_roundtrip(tmp_path):
+    csv_path = tmp_path / "ads.csv"
+    df = pd.DataFrame({
+        "date": ["2025-01-01", "2025-01-02", "2025-01-03"],
+        "country": ["US", None, "IN"],
+        "spend": [100.0, 50.5, 0.0],
+        "impressions": [1000, 500, 0]
+    })
+    df.to_csv(csv_path, index=False)
+    df = pd.read_csv(csv_path)
+
+    cache_dir = tmp_path / "cache"
+    summary = {"rows": 3}
+
+    first = SharedDataset(str(csv_path), str(cache_dir))
+    s1, df1 = first.attach(lambda: (summary, df))
+
+    # Second attach must reuse the cache instead of rebuilding
+    second = SharedDataset(str(csv_path), str(cache_dir))
+    s2, df2 = second.attach(lambda: (_ for _ in ()).throw(AssertionError("rebuilt")))
+
+    assert s1 == s2 == summary
+    pd.testing.assert_frame_equal(df1, df, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(df2, df, check_dtype=False, check_categorical=False)
+    assert not df2["spend"].to_numpy().flags.writeable
+
+    # String columns are Categoricals over the mapped codes, not private copies
+    for col in ("date", "country"):
+        assert df2[col].dtype == "category"
+        codes = df2[col].array.codes
+        assert any(np.shares_memory(codes, m) for m in second._maps)
+
+    # Cache survives until the last reference detaches
+    first.detach()
+    assert os.path.isdir(first.path)
+    second.detach()
+    assert not os.path.isdir(first.path)
+
+
+def test_shared_dataset_sweeps_orphaned_caches(tmp_path):
+    import subprocess
+    import sys
+
+    cache_dir = tmp_path / "cache"
+    df = pd.DataFrame({"spend": [1.0, 2.0]})
+
+    old_csv = tmp_path / "old.csv"
+    df.to_csv(old_csv, index=False)
+    orphan = SharedDataset(str(old_csv), str(cache_dir))
+    orphan.attach(lambda: ({}, df))
+
+    # Simulate a crashed run: its only ref belongs to a dead process
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    os.remove(orphan.ref_path)
+    with open(os.path.join(orphan.path, "refs", f"{dead.pid}-deadbeef"), "w") as f:
+        f.write(str(dead.pid))
+    orphan.attached = False
+
+    # Temp folders left by a writer that died mid-materialise; a live writer's stays
+    dead_tmp = cache_dir / f".{orphan.key}-{dead.pid}-abc123"
+    live_tmp = cache_dir / f".{orphan.key}-{os.getpid()}-def456"
+    dead_tmp.mkdir()
+    live_tmp.mkdir()
+
+    new_csv = tmp_path / "new.csv"
+    df.to_csv(new_csv, index=False)
+    fresh = SharedDataset(str(new_csv), str(cache_dir))
+    fresh.attach(lambda: ({}, df))
+
+    assert not os.path.isdir(orphan.path)
+    assert not dead_tmp.exists()
+    assert live_tmp.exists()
+    assert os.path.isdir(fresh.path)
+    fresh.detach()
+
+
+def test_shared_dataset_builds_once_for_concurrent_cold_runs(tmp_path):
+    import threading
+    import time
+
+    csv_path = tmp_path / "ads.csv"
+    df = pd.DataFrame({"spend": [1.0, 2.0, 3.0]})
+    df.to_csv(csv_path, index=False)
+    cache_dir = tmp_path / "cache"
+
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.2)  # keep the build lock held while the others arrive
+        return {}, df
+
+    handles = [SharedDataset(str(csv_path), str(cache_dir)) for _ in range(4)]
+    results = [None] * len(handles)
+
+    def run(i):
+        results[i] = handles[i].attach(build)[1]
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(handles))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(builds) == 1
+    for attached in results:
+        pd.testing.assert_frame_equal(attached, df)
+
+    results.clear()
+    for h in handles:
+        h.detach()
+    assert not os.path.isdir(handles[0].path)